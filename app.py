@@ -1,9 +1,15 @@
 # app.py
 from flask import (
-    Flask, render_template, request, redirect, url_for, flash
+    Flask, render_template, request, redirect, url_for, flash, abort, g
 )
 from models import db, Club, Room, Meeting
+from sqlalchemy import (
+    event, func, select, case, cast, exists, literal, text, union_all, Float
+)
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.orm import selectinload
 from datetime import datetime, date as dt_date, time as dt_time
+import math
 import os
 
 # ----------------------------
@@ -20,54 +26,177 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 db.init_app(app)
 
-with app.app_context():
-    db.create_all()
-
-    # ---- Seed data if tables are empty (for cloud deployment) ----
-    if not Club.query.first():
-        db.session.add_all([
-            Club(name="Chess Club"),
-            Club(name="Robotics"),
-            Club(name="Art Society"),
+PER_PAGE = 50  # rows per page on the meetings list and report tables
+
+def _empty(model):
+    """True if the model's table has no rows (probes the PK, no ORM object)."""
+    pk = model.__table__.primary_key.columns[0]
+    return db.session.query(pk).limit(1).first() is None
+
+def ensure_schema():
+    """Create whatever tables and indexes app.db is missing.
+
+    One sqlite_master read covers both. create_all() alone would reflect every
+    table, and would skip indexes added to a table that already exists.
+    """
+    with db.engine.begin() as conn:
+        have = set(conn.execute(text("SELECT name FROM sqlite_master")).scalars())
+        if not have.issuperset(db.metadata.tables):
+            db.metadata.create_all(conn)
+        for table in db.metadata.sorted_tables:
+            for ix in table.indexes:
+                if ix.name not in have:
+                    conn.execute(CreateIndex(ix, if_not_exists=True))
+
+def _insert_if_empty(model, rows):
+    """INSERT ... SELECT `rows` guarded by NOT EXISTS: no probe round-trip."""
+    cols = list(rows[0])
+    src = union_all(*(select(*(literal(r[c]).label(c) for c in cols))
+                      for r in rows)).subquery()
+    db.session.execute(db.insert(model).from_select(
+        cols, select(src).where(~exists().select_from(model))))
+
+def seed_reference_data():
+    """Insert the default clubs and rooms into whichever table is empty."""
+    with db.session.begin():
+        _insert_if_empty(Club, [
+            {"name": "Chess Club"},
+            {"name": "Robotics"},
+            {"name": "Art Society"},
         ])
-
-    if not Room.query.first():
-        db.session.add_all([
-            Room(building="Eng", number="101", max_capacity=40),
-            Room(building="Sci", number="202", max_capacity=60),
+        _insert_if_empty(Room, [
+            {"building": "Eng", "number": "101", "max_capacity": 40},
+            {"building": "Sci", "number": "202", "max_capacity": 60},
         ])
 
-    db.session.commit()
+with app.app_context():
+    # WAL lets readers run during a write, and synchronous=NORMAL drops the
+    # per-commit fsync; a crash can lose only the last few commits.
+    @event.listens_for(db.engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.close()
+
+    # On a warm database this is a single sqlite_master read per worker boot.
+    ensure_schema()
+
+    # ---- Seed data (for cloud deployment) ----
+    seed_reference_data()
 
 
 # ----------------------------
 # Helpers
 # ----------------------------
 def parse_date(s: str):
-    """HTML date input -> Python date (YYYY-MM-DD)."""
-    return datetime.strptime(s, "%Y-%m-%d").date() if s else None
+    """HTML date input -> Python date (YYYY-MM-DD); raises ValueError otherwise."""
+    if not s:
+        return None
+    # fromisoformat also takes YYYYMMDD and ISO week dates; forms never send those
+    if len(s) != 10 or s[4] != "-" or s[7] != "-":
+        raise ValueError(f"invalid date: {s!r}")
+    return dt_date.fromisoformat(s)
 
 def parse_time(s: str):
-    """Accept both HH:MM and HH:MM:SS from forms."""
+    """Accept both HH:MM and HH:MM:SS from forms; raises ValueError otherwise."""
     if not s:
         return None
-    for fmt in ("%H:%M", "%H:%M:%S"):
-        try:
-            return datetime.strptime(s, fmt).time()
-        except ValueError:
-            continue
-    # fall back to None (or raise if you prefer)
-    return None
-
-def reject_if_past(d, t):
-    """Return True if the combined datetime is in the past."""
+    # fromisoformat also takes bare hours, fractions and UTC offsets
+    if len(s) not in (5, 8) or s[2] != ":" or (len(s) == 8 and s[5] != ":"):
+        raise ValueError(f"invalid time: {s!r}")
+    t = dt_time.fromisoformat(s)
+    if t.tzinfo is not None:
+        raise ValueError(f"invalid time: {s!r}")
+    return t
+
+def _int(name, default=0, lo=None):
+    """Integer form field; missing or non-numeric values give `default`."""
+    v = request.form.get(name)
+    if not v:
+        return default
+    try:
+        n = int(v)
+    except ValueError:
+        return default
+    return max(lo, n) if lo is not None else n
+
+def _form_when():
+    """(date, start_time) from the meeting form; aborts with 400 if unusable.
+
+    The parsers only return naive YYYY-MM-DD / HH:MM[:SS] values, so
+    reject_if_past never compares an offset-aware time against g.now.
+    """
+    try:
+        d = parse_date(request.form.get("date"))
+        t = parse_time(request.form.get("start_time"))
+    except ValueError:
+        abort(400, description="Invalid date or start time.")
+    if d is None or t is None:
+        abort(400, description="Date and start time are required.")
+    return d, t
+
+def reject_if_past(d, t, now=None):
+    """Return True if the combined datetime is in the past (default: g.now)."""
     if not d or not t:
         return False
-    return datetime.combine(d, t) < datetime.now()
+    return datetime.combine(d, t) < (now or g.now)
+
+# Clubs and rooms only change through admin edits, so the dropdown lists
+# are kept per process and dropped whenever a Club/Room row is written.
+# Plain rows are cached (not ORM objects) so they outlive the session.
+_meta_cache = {"clubs": None, "rooms": None}
+
+def get_clubs_cached():
+    """(club_id, name) rows for dropdowns, ordered by name."""
+    if _meta_cache["clubs"] is None:
+        _meta_cache["clubs"] = (db.session.query(Club.club_id, Club.name)
+                                .order_by(Club.name).all())
+    return _meta_cache["clubs"]
+
+def get_rooms_cached():
+    """(room_id, building, number) rows for dropdowns."""
+    if _meta_cache["rooms"] is None:
+        _meta_cache["rooms"] = (db.session.query(Room.room_id, Room.building, Room.number)
+                                .order_by(Room.building, Room.number).all())
+    return _meta_cache["rooms"]
+
+def _invalidator(key):
+    def invalidate(mapper, connection, target):
+        _meta_cache[key] = None
+    return invalidate
+
+for _model, _key in ((Club, "clubs"), (Room, "rooms")):
+    for _evt in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _evt, _invalidator(_key))
+
+def _page(total):
+    """(page, pages) for `total` rows, with ?page= clamped to 1..pages."""
+    pages = max(1, math.ceil(total / PER_PAGE))
+    return min(max(1, request.args.get("page", 1, type=int)), pages), pages
+
+def report_filters(club_id, room_id, date_from, date_to):
+    """Build the WHERE clauses shared by the report's row and aggregate queries."""
+    filters = []
+    if club_id:
+        filters.append(Meeting.club_id == club_id)
+    if room_id:
+        filters.append(Meeting.room_id == room_id)
+    if date_from:
+        filters.append(Meeting.date >= date_from)
+    if date_to:
+        filters.append(Meeting.date <= date_to)
+    return filters
 
 # ----------------------------
 # Routes
 # ----------------------------
+@app.before_request
+def _stash_now():
+    # one clock read per request, shared by validation and templates
+    g.now = datetime.now()
+
 @app.route("/")
 def home():
     return render_template("index.html")
@@ -75,37 +204,46 @@ def home():
 # ---- Meetings: list
 @app.route("/meetings")
 def meetings_list():
-    rows = Meeting.query.order_by(Meeting.date.desc(), Meeting.start_time.desc()).all()
-    return render_template("meetings_list.html", rows=rows)
+    # bound ?page= first: an out-of-range OFFSET overflows SQLite's INTEGER
+    page, pages = _page(db.session.query(func.count(Meeting.meeting_id)).scalar())
+    pagination = (Meeting.query
+                  .options(selectinload(Meeting.club), selectinload(Meeting.room))
+                  .order_by(Meeting.date.desc(), Meeting.start_time.desc())
+                  .paginate(page=page, per_page=PER_PAGE, count=False))
+    return render_template("meetings_list.html",
+                           rows=pagination.items, page=page, pages=pages)
 
 # ---- Meetings: new (form)
 @app.route("/meetings/new")
 def meetings_new():
-    clubs = Club.query.order_by(Club.name).all()
-    rooms = Room.query.order_by(Room.building, Room.number).all()
+    clubs = get_clubs_cached()
+    rooms = get_rooms_cached()
     return render_template("meeting_form.html",
-                           mode="create", m=None, clubs=clubs, rooms=rooms, now=datetime.now())
+                           mode="create", m=None, clubs=clubs, rooms=rooms, now=g.now)
 
 # ---- Meetings: create (submit)
 @app.route("/meetings", methods=["POST"])
 def meetings_create():
-    d = parse_date(request.form.get("date"))
-    t = parse_time(request.form.get("start_time"))
+    d, t = _form_when()
+    club_id = _int("club_id", default=None)
+    room_id = _int("room_id", default=None)
+    if club_id is None or room_id is None:
+        abort(400, description="Club and room are required.")
 
     if reject_if_past(d, t):
         flash("Cannot schedule a meeting in the past!")
         return redirect(url_for("meetings_new"))
 
-    invited = max(0, int(request.form.get("invited_count") or 0))
-    accepted = max(0, int(request.form.get("accepted_count") or 0))
+    invited = _int("invited_count", lo=0)
+    accepted = _int("accepted_count", lo=0)
 
     m = Meeting(
         date=d,
         start_time=t,
-        duration_minutes=int(request.form.get("duration_minutes") or 0),
+        duration_minutes=_int("duration_minutes"),
         description=request.form.get("description"),
-        club_id=int(request.form.get("club_id")),
-        room_id=int(request.form.get("room_id")),
+        club_id=club_id,
+        room_id=room_id,
         invited_count=invited,
         accepted_count=accepted,
     )
@@ -117,19 +255,22 @@ def meetings_create():
 # ---- Meetings: edit (form)
 @app.route("/meetings/<int:meeting_id>/edit")
 def meetings_edit(meeting_id):
-    m = Meeting.query.get_or_404(meeting_id)
-    clubs = Club.query.order_by(Club.name).all()
-    rooms = Room.query.order_by(Room.building, Room.number).all()
+    m = db.session.get(Meeting, meeting_id) or abort(404)
+    clubs = get_clubs_cached()
+    rooms = get_rooms_cached()
     return render_template("meeting_form.html",
-                           mode="edit", m=m, clubs=clubs, rooms=rooms, now=datetime.now())
+                           mode="edit", m=m, clubs=clubs, rooms=rooms, now=g.now)
 
 # ---- Meetings: update (submit)
 @app.route("/meetings/<int:meeting_id>/update", methods=["POST"])
 def meetings_update(meeting_id):
-    m = Meeting.query.get_or_404(meeting_id)
+    m = db.session.get(Meeting, meeting_id) or abort(404)
 
-    d = parse_date(request.form.get("date"))
-    t = parse_time(request.form.get("start_time"))
+    d, t = _form_when()
+    club_id = _int("club_id", default=None)
+    room_id = _int("room_id", default=None)
+    if club_id is None or room_id is None:
+        abort(400, description="Club and room are required.")
 
     if reject_if_past(d, t):
         flash("Cannot schedule a meeting in the past!")
@@ -137,12 +278,12 @@ def meetings_update(meeting_id):
 
     m.date = d
     m.start_time = t
-    m.duration_minutes = int(request.form.get("duration_minutes") or 0)
+    m.duration_minutes = _int("duration_minutes")
     m.description = request.form.get("description")
-    m.club_id = int(request.form.get("club_id"))
-    m.room_id = int(request.form.get("room_id"))
-    m.invited_count = max(0, int(request.form.get("invited_count") or 0))
-    m.accepted_count = max(0, int(request.form.get("accepted_count") or 0))
+    m.club_id = club_id
+    m.room_id = room_id
+    m.invited_count = _int("invited_count", lo=0)
+    m.accepted_count = _int("accepted_count", lo=0)
 
     db.session.commit()
     flash("Meeting updated!")
@@ -151,7 +292,7 @@ def meetings_update(meeting_id):
 # ---- Meetings: delete
 @app.route("/meetings/<int:meeting_id>/delete", methods=["POST"])
 def meetings_delete(meeting_id):
-    m = Meeting.query.get_or_404(meeting_id)
+    m = db.session.get(Meeting, meeting_id) or abort(404)
     db.session.delete(m)
     db.session.commit()
     flash("Meeting deleted!")
@@ -160,47 +301,59 @@ def meetings_delete(meeting_id):
 # ---- Report
 @app.route("/report")
 def report():
-    clubs = Club.query.order_by(Club.name).all()
-    rooms = Room.query.order_by(Room.building, Room.number).all()
+    clubs = get_clubs_cached()
+    rooms = get_rooms_cached()
 
     club_id = request.args.get("club_id", type=int)
     room_id = request.args.get("room_id", type=int)
     date_from_s = request.args.get("date_from")
     date_to_s = request.args.get("date_to")
-    date_from = parse_date(date_from_s) if date_from_s else None
-    date_to = parse_date(date_to_s) if date_to_s else None
-
-    q = Meeting.query
-    if club_id:
-        q = q.filter(Meeting.club_id == club_id)
-    if room_id:
-        q = q.filter(Meeting.room_id == room_id)
-    if date_from:
-        q = q.filter(Meeting.date >= date_from)
-    if date_to:
-        q = q.filter(Meeting.date <= date_to)
-
-    rows = q.order_by(Meeting.date, Meeting.start_time).all()
-
-    n = len(rows)
-    avg_duration = (sum(m.duration_minutes for m in rows)/n) if n else 0
-    avg_invited  = (sum(m.invited_count  for m in rows)/n) if n else 0
-    avg_accepted = (sum(m.accepted_count for m in rows)/n) if n else 0
-    rates = [(m.accepted_count/m.invited_count) for m in rows if m.invited_count]
-    avg_attendance_rate = (sum(rates)/len(rates)) if rates else 0
+    try:
+        date_from = parse_date(date_from_s) if date_from_s else None
+        date_to = parse_date(date_to_s) if date_to_s else None
+    except ValueError:
+        abort(400, description="Invalid date filter.")
+
+    filters = report_filters(club_id, room_id, date_from, date_to)
+
+    # Averages (and the total for paging) are computed by SQLite in one pass
+    # over the full selection; only the scalars come back.
+    n, avg_duration, avg_invited, avg_accepted, avg_attendance_rate = db.session.query(
+        func.count(Meeting.meeting_id),
+        func.avg(Meeting.duration_minutes),
+        func.avg(Meeting.invited_count),
+        func.avg(Meeting.accepted_count),
+        # AVG skips the NULLs, so only meetings with invitees count
+        func.avg(case((Meeting.invited_count > 0,
+                       cast(Meeting.accepted_count, Float) / Meeting.invited_count),
+                      else_=None)),
+    ).filter(*filters).one()
+    page, pages = _page(n)
+
+    # Only the rendered columns, as plain rows: no Meeting objects to hydrate.
+    rows = db.session.execute(
+        select(Meeting.date, Meeting.start_time,
+               Club.name.label("club_name"), Room.building, Room.number,
+               Meeting.invited_count, Meeting.accepted_count, Meeting.description)
+        .outerjoin(Meeting.club).outerjoin(Meeting.room)
+        .where(*filters)
+        .order_by(Meeting.date, Meeting.start_time)
+        .limit(PER_PAGE).offset((page - 1) * PER_PAGE)
+    ).all()
 
     return render_template(
         "report.html",
         clubs=clubs, rooms=rooms, rows=rows,
+        page=page, pages=pages,
         filters={
             "club_id": club_id, "room_id": room_id,
             "date_from": date_from_s, "date_to": date_to_s
         },
         stats={
-            "avg_duration": round(avg_duration, 2),
-            "avg_invited": round(avg_invited, 2),
-            "avg_accepted": round(avg_accepted, 2),
-            "avg_attendance_rate": round(avg_attendance_rate, 3),
+            "avg_duration": round(avg_duration or 0, 2),
+            "avg_invited": round(avg_invited or 0, 2),
+            "avg_accepted": round(avg_accepted or 0, 2),
+            "avg_attendance_rate": round(avg_attendance_rate or 0, 3),
         },
     )
 
@@ -211,26 +364,16 @@ def report():
 def init_db():
     """Create tables and seed a little data."""
     with app.app_context():
-        db.create_all()
-        if not Club.query.first():
-            db.session.add_all([
-                Club(name="Chess Club"),
-                Club(name="Robotics"),
-                Club(name="Art Society"),
-            ])
-        if not Room.query.first():
-            db.session.add_all([
-                Room(building="Eng", number="101", max_capacity=40),
-                Room(building="Sci", number="202", max_capacity=60),
-            ])
-        if not Meeting.query.first():
-            db.session.add_all([
-                Meeting(date=dt_date(2025, 11, 10), start_time=dt_time(12, 0),
-                        duration_minutes=60, description="Weekly meetup",
-                        club_id=1, room_id=1, invited_count=20, accepted_count=12),
-                Meeting(date=dt_date(2025, 11, 12), start_time=dt_time(15, 30),
-                        duration_minutes=90, description="Workshop",
-                        club_id=2, room_id=2, invited_count=35, accepted_count=22),
+        ensure_schema()
+        seed_reference_data()
+        if _empty(Meeting):
+            db.session.execute(db.insert(Meeting), [
+                dict(date=dt_date(2025, 11, 10), start_time=dt_time(12, 0),
+                     duration_minutes=60, description="Weekly meetup",
+                     club_id=1, room_id=1, invited_count=20, accepted_count=12),
+                dict(date=dt_date(2025, 11, 12), start_time=dt_time(15, 30),
+                     duration_minutes=90, description="Workshop",
+                     club_id=2, room_id=2, invited_count=35, accepted_count=22),
             ])
         db.session.commit()
         print("Database initialized & seeded.")
@@ -17,6 +17,12 @@ class Room(db.Model):
 
 class Meeting(db.Model):
     __tablename__ = "meetings"
+    __table_args__ = (
+        # meetings list: ORDER BY date DESC, start_time DESC
+        db.Index("ix_meetings_date_start", "date", "start_time"),
+        # report: club/room equality filters plus a date range
+        db.Index("ix_meetings_club_room_date", "club_id", "room_id", "date"),
+    )
     meeting_id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False)
     start_time = db.Column(db.Time, nullable=False)
@@ -27,5 +33,7 @@ class Meeting(db.Model):
     invited_count = db.Column(db.Integer, default=0)
     accepted_count = db.Column(db.Integer, default=0)
 
-    club = db.relationship("Club")
-    room = db.relationship("Room")
+    # Lazy loads raise instead of querying; routes that render these must
+    # eager-load them (selectinload) so the list never goes N+1.
+    club = db.relationship("Club", lazy="raise_on_sql")
+    room = db.relationship("Room", lazy="raise_on_sql")